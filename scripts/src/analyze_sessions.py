@@ -19,6 +19,30 @@ import sys
 import argparse
 from pathlib import Path
 
+try:
+    from src.trace_utils import extract_session_ids, read_jsonl
+except ImportError:  # run directly, e.g. python src/analyze_sessions.py
+    from trace_utils import extract_session_ids, read_jsonl
+
+# Short, attribute-safe names for the span columns read in per-row loops
+SPAN_COLUMNS = {
+    'attributes.openinference.span.kind': 'span_kind',
+    'context.trace_id': 'trace_id',
+    'context.span_id': 'span_id',
+    'attributes.input.value': 'input_val',
+    'attributes.output.value': 'output_val',
+    'attributes.llm.input_messages': 'input_messages',
+    'attributes.llm.output_messages': 'output_messages',
+}
+
+# Span-tree line prefixes by depth, built once instead of per printed node
+TREE_PREFIXES = tuple("  " * depth + "└─ " for depth in range(64))
+
+# Every column the analysis reads; the rest of the export is dropped after loading
+ANALYSIS_COLUMNS = [
+    'name', 'parent_id', 'start_time', 'end_time', 'metadata', 'attributes.metadata', *SPAN_COLUMNS,
+]
+
 def find_trace_file():
     """Auto-detect trace file from arize/ or phoenix/ folders."""
     script_dir = Path(__file__).parent.parent
@@ -35,6 +59,23 @@ def find_trace_file():
 
     return None
 
+def load_traces(path: Path) -> pd.DataFrame:
+    """Load a JSONL trace export, decoding each line with orjson."""
+    df = read_jsonl(path)
+
+    # Epoch-ms timestamps become datetimes, as pd.read_json would convert them
+    for column in ('start_time', 'end_time'):
+        if column in df.columns and pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column], unit='ms')
+
+    return df
+
+def _as_datetime(values: pd.Series) -> pd.Series:
+    """Return a timestamp column as datetimes, treating numbers as epoch ms."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values, unit='ms', errors='coerce')
+
 def parse_args():
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(
@@ -73,54 +114,19 @@ def main():
         print(f"❌ Error: Data file not found: {data_file}")
         sys.exit(1)
 
-    df = pd.read_json(data_file, lines=True)
+    df = load_traces(data_file)
 
     print(f"Total records: {len(df)}")
     print(f"\nColumns: {len(df.columns)}")
 
-    # Extract session IDs from metadata
-    def extract_session_id(metadata):
-        if pd.isna(metadata):
-            return None
-
-        # Handle string representation of dict (Phoenix format)
-        if isinstance(metadata, str):
-            if 'session_' in metadata:
-                # Extract from pattern like: _session_ae99895f-9fad-4453-bb91-1005e8ccc4d3
-                parts = metadata.split('session_')
-                if len(parts) > 1:
-                    # Get the session ID (everything after 'session_')
-                    session_id = parts[-1].rstrip("'}\"")  # Remove trailing quotes/braces
-                    return session_id
-            return None
-
-        if not isinstance(metadata, dict):
-            return None
-
-        # Try Phoenix format: metadata.user_id with _session_ pattern
-        user_id = metadata.get('user_id')
-        if user_id and 'session_' in str(user_id):
-            return str(user_id).split('session_')[-1]
-
-        # Try Arize format: user_api_key_end_user_id
-        user_id = metadata.get('user_api_key_end_user_id')
-        if user_id and 'session_' in user_id:
-            return user_id.split('session_')[-1]
-
-        # Also try requester_metadata.user_id (Arize format)
-        req_meta = metadata.get('requester_metadata', {})
-        if isinstance(req_meta, dict):
-            user_id = req_meta.get('user_id')
-            if user_id and 'session_' in user_id:
-                return user_id.split('session_')[-1]
-
-        return None
+    # Keep only the columns used below so later filters and copies stay narrow
+    df = df.drop(columns=[column for column in df.columns if column not in ANALYSIS_COLUMNS])
 
     # Check both metadata columns
     if 'metadata' in df.columns:
-        df['session_id'] = df['metadata'].apply(extract_session_id)
+        df['session_id'] = extract_session_ids(df['metadata'])
     elif 'attributes.metadata' in df.columns:
-        df['session_id'] = df['attributes.metadata'].apply(extract_session_id)
+        df['session_id'] = extract_session_ids(df['attributes.metadata'])
     else:
         print("❌ No metadata column found")
         df['session_id'] = None
@@ -164,54 +170,50 @@ def main():
         if len(small_sessions) > 0:
             smallest_session = small_sessions.index[0]
             print(f"\n🎯 Analyzing session: {smallest_session}")
-            session_df = df[df['session_id'] == smallest_session].copy()
-            session_df = session_df.sort_values('start_time')
+            session_df = df[df['session_id'] == smallest_session].rename(columns=SPAN_COLUMNS)
+
+            # Sort once (unless already in order); the breakdown and span tree below reuse this order
+            if not session_df['start_time'].is_monotonic_increasing:
+                session_df = session_df.sort_values('start_time')
 
-            for _, row in session_df.head(10).iterrows():
-                print(f"  [{row['start_time']}] {row['name']} ({row['attributes.openinference.span.kind']}) - trace:{row['context.trace_id'][:8]}, span:{row['context.span_id'][:8]}")
+            # Short span IDs for display, sliced once for the whole session
+            session_df['span_id8'] = session_df['span_id'].str[:8]
+
+            for row in session_df.head(10).itertuples(index=False):
+                print(f"  [{row.start_time}] {row.name} ({row.span_kind}) - trace:{row.trace_id[:8]}, span:{row.span_id8}")
 
             # Now reconstruct the full session thread
             print(f"\n🧵 Reconstructing session thread for {smallest_session}...")
 
-            # Get all records for this session
-            session_df = df[df['session_id'] == smallest_session].copy()
+            # Input/output columns are optional in the export
+            for column in ('input_val', 'output_val', 'input_messages', 'output_messages'):
+                if column not in session_df.columns:
+                    session_df[column] = None
 
-            # Sort by start_time for chronological order
-            session_df = session_df.sort_values('start_time')
+            # Convert timestamps and compute durations once for the whole session
+            session_df['start_dt'] = _as_datetime(session_df['start_time'])
+            session_df['end_dt'] = _as_datetime(session_df['end_time'])
+            session_df['duration_s'] = (session_df['end_dt'] - session_df['start_dt']).dt.total_seconds().fillna(0)
 
             print(f"\nSession has {len(session_df)} records")
             print(f"\nDetailed breakdown:")
 
-            for idx, row in session_df.iterrows():
-                kind = row['attributes.openinference.span.kind']
-                name = row['name']
-                trace_id = row['context.trace_id']
-                span_id = row['context.span_id']
-                parent_id = row['parent_id']
-                start_time = row['start_time']
-                end_time = row['end_time']
-
-                # Convert timestamps to datetime if needed
-                if not isinstance(start_time, pd.Timestamp):
-                    start = pd.to_datetime(start_time, unit='ms')
-                else:
-                    start = start_time
-
-                if not isinstance(end_time, pd.Timestamp):
-                    end = pd.to_datetime(end_time, unit='ms')
-                else:
-                    end = end_time
-
-                # Calculate duration in seconds
-                duration = (end - start).total_seconds() if pd.notna(start) and pd.notna(end) else 0
+            for row in session_df.itertuples(index=False):
+                kind = row.span_kind
+                name = row.name
+                trace_id = row.trace_id
+                span_id = row.span_id
+                parent_id = row.parent_id
+                start = row.start_dt
+                duration = row.duration_s
 
                 # Get input/output if available
-                input_val = row.get('attributes.input.value', '')
-                output_val = row.get('attributes.output.value', '')
+                input_val = row.input_val
+                output_val = row.output_val
 
                 # Get LLM messages if available
-                input_messages = row.get('attributes.llm.input_messages', None)
-                output_messages = row.get('attributes.llm.output_messages', None)
+                input_messages = row.input_messages
+                output_messages = row.output_messages
 
                 print(f"\n{'='*80}")
                 print(f"[{start.strftime('%H:%M:%S.%f')[:-3]}] {name}")
@@ -250,18 +252,30 @@ def main():
             # Build parent-child tree
             print(f"\n\n🌳 Span Tree Structure:")
 
+            # Index children by parent in one pass, as plain (name, kind, span_id, span_id8)
+            # tuples; appending in row order keeps the start_time order
+            children_by_parent = {}
+            tree_columns = ['parent_id', 'name', 'span_kind', 'span_id', 'span_id8']
+            for parent_id, *child in session_df[tree_columns].itertuples(index=False, name=None):
+                if pd.notna(parent_id):
+                    children_by_parent.setdefault(parent_id, []).append(tuple(child))
+
             def print_tree(parent_id, indent=0):
-                children = session_df[session_df['parent_id'] == parent_id]
-                for _, child in children.sort_values('start_time').iterrows():
-                    prefix = "  " * indent + "└─ "
-                    print(f"{prefix}{child['name']} ({child['attributes.openinference.span.kind']}) - {child['context.span_id'][:8]}")
-                    print_tree(child['context.span_id'], indent + 1)
+                # Depth-first walk with an explicit stack, so deep tool-call chains
+                # cannot hit the recursion limit; children are pushed in reverse
+                # so they pop in start_time order
+                stack = [(child, indent) for child in reversed(children_by_parent.get(parent_id, ()))]
+                while stack:
+                    (name, kind, span_id, span_id8), depth = stack.pop()
+                    prefix = TREE_PREFIXES[depth] if depth < len(TREE_PREFIXES) else "  " * depth + "└─ "
+                    print(f"{prefix}{name} ({kind}) - {span_id8}")
+                    stack.extend((child, depth + 1) for child in reversed(children_by_parent.get(span_id, ())))
 
             # Start with root spans (no parent)
             roots = session_df[session_df['parent_id'].isna()]
-            for _, root in roots.sort_values('start_time').iterrows():
-                print(f"ROOT: {root['name']} ({root['attributes.openinference.span.kind']}) - {root['context.span_id'][:8]}")
-                print_tree(root['context.span_id'], 1)
+            for root in roots.itertuples(index=False):
+                print(f"ROOT: {root.name} ({root.span_kind}) - {root.span_id8}")
+                print_tree(root.span_id, 1)
 
 
 if __name__ == '__main__':
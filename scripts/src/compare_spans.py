@@ -12,42 +12,113 @@ and outputs. Checks if text from earlier spans appears anywhere in later spans.
 Usage:
     uv run compare_spans.py phoenix/phoenix_sessions.jsonl
     uv run compare_spans.py phoenix/phoenix_sessions.jsonl --session 1
+    uv run compare_spans.py phoenix/phoenix_sessions.jsonl --jobs 0
 """
 
 import argparse
 import ast
+import hashlib
+import io
 import json
+import os
 import sys
+from collections import deque
+from contextlib import redirect_stdout
+from multiprocessing import Pool
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterator, List
+
+import orjson
+
+try:
+    from src.trace_utils import loads_json
+except ImportError:  # run directly, e.g. python src/compare_spans.py
+    from trace_utils import loads_json
+
+# Bytes read per call when streaming session files
+READ_CHUNK_SIZE = 1 << 20
+
+# Sessions queued per worker process; bounds how far --jobs reads ahead of the output
+SESSIONS_IN_FLIGHT_PER_WORKER = 2
+
+
+def _dumps_canonical(obj) -> bytes:
+    """Serialize to compact JSON bytes with sorted keys."""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+
+
+def iter_sessions(filepath: Path) -> Iterator[Dict]:
+    """Yield sessions from a JSONL file, reading it in large binary chunks."""
+    with open(filepath, 'rb') as f:
+        # Pieces of a line that spans chunk boundaries (session lines can be MBs)
+        partial = []
+        while chunk := f.read(READ_CHUNK_SIZE):
+            *lines, tail = chunk.split(b'\n')
+            if lines:
+                lines[0] = b''.join(partial) + lines[0]
+                partial = []
+                for line in lines:
+                    if line.strip():
+                        yield loads_json(line)
+            partial.append(tail)
+
+        last = b''.join(partial)
+        if last.strip():
+            yield loads_json(last)
 
 
 def load_sessions(filepath: Path) -> List[Dict]:
     """Load sessions from JSONL file."""
-    sessions = []
-    with open(filepath, 'r') as f:
-        for line in f:
-            sessions.append(json.loads(line))
-    return sessions
+    return list(iter_sessions(filepath))
+
 
+def text_length(value) -> int:
+    """Return the length of a value as text, without copying values that are already strings."""
+    return len(value) if isinstance(value, str) else len(str(value))
 
-def compare_messages(msg1: List, msg2: List) -> Dict[str, Any]:
-    """Compare two message lists and return overlap statistics."""
-    # Convert to comparable format
-    msg1_str = [json.dumps(m, sort_keys=True) if isinstance(m, dict) else str(m) for m in (msg1 or [])]
-    msg2_str = [json.dumps(m, sort_keys=True) if isinstance(m, dict) else str(m) for m in (msg2 or [])]
+
+def message_fingerprint(message) -> bytes:
+    """Return a 16-byte digest of a message's canonical JSON for equality checks."""
+    if isinstance(message, dict):
+        canonical = _dumps_canonical(message)
+    else:
+        canonical = str(message).encode()
+    return hashlib.blake2b(canonical, digest_size=16).digest()
+
+
+def compare_messages(
+    msg1: List,
+    msg2: List,
+    msg1_fps: List[bytes] | None = None,
+    msg2_fps: List[bytes] | None = None,
+) -> Dict[str, Any]:
+    """Compare two message lists and return overlap statistics.
+
+    Fingerprints already computed with message_fingerprint can be passed in to
+    avoid hashing the same messages again.
+    """
+    msg1 = msg1 or []
+    msg2 = msg2 or []
+
+    # Compare fixed-size fingerprints instead of multi-KB message strings
+    if msg1_fps is None:
+        msg1_fps = [message_fingerprint(m) for m in msg1]
+    if msg2_fps is None:
+        msg2_fps = [message_fingerprint(m) for m in msg2]
+    msg1_set = set(msg1_fps)
+    msg2_set = set(msg2_fps)
 
     # Find duplicates (messages from msg1 that appear in msg2)
-    duplicates = [m for m in msg1_str if m in msg2_str]
+    duplicates = [m for m, fp in zip(msg1, msg1_fps) if fp in msg2_set]
 
     # Find new messages (in msg2 but not in msg1)
-    new_msgs = [m for m in msg2_str if m not in msg1_str]
+    new_msgs = [m for m, fp in zip(msg2, msg2_fps) if fp not in msg1_set]
 
-    overlap_pct = (len(duplicates) / len(msg2_str) * 100) if msg2_str else 0
+    overlap_pct = (len(duplicates) / len(msg2) * 100) if msg2 else 0
 
     return {
-        'total_previous': len(msg1_str),
-        'total_current': len(msg2_str),
+        'total_previous': len(msg1),
+        'total_current': len(msg2),
         'duplicated_count': len(duplicates),
         'new_count': len(new_msgs),
         'overlap_percentage': overlap_pct,
@@ -130,10 +201,15 @@ def extract_content(span: Dict) -> str:
     return '\n'.join(content_parts)
 
 
-def check_content_containment(earlier_span: Dict, later_span: Dict) -> Dict[str, Any]:
-    """Check if content from earlier span is contained in later span (fuzzy/subset matching)."""
-    earlier_content = extract_content(earlier_span)
-    later_content = extract_content(later_span)
+def check_content_containment(
+    earlier_span: Dict, later_span: Dict, later_content: str | None = None
+) -> Dict[str, Any]:
+    """Check if content from earlier span is contained in later span (fuzzy/subset matching).
+
+    Pass later_content (from extract_content) to reuse it across many earlier spans.
+    """
+    if later_content is None:
+        later_content = extract_content(later_span)
 
     # Extract individual text chunks from earlier span to check
     chunks = []
@@ -179,9 +255,9 @@ def check_content_containment(earlier_span: Dict, later_span: Dict) -> Dict[str,
 
     for chunk_type, chunk_text in chunks:
         # Fuzzy check: is this chunk contained as substring in later content?
-        if chunk_text in later_content:
-            # Find the position and context
-            pos = later_content.find(chunk_text)
+        # A single find() both tests membership and gives the position
+        pos = later_content.find(chunk_text)
+        if pos != -1:
             # Get some context around the match (50 chars before and after)
             context_start = max(0, pos - 50)
             context_end = min(len(later_content), pos + len(chunk_text) + 50)
@@ -225,9 +301,11 @@ def analyze_session(session: Dict) -> None:
 
     if len(spans) > 1:
         last_span = spans[-1]
+        # Extract the last span's content once and reuse it for every comparison
+        last_content = extract_content(last_span)
 
         for i, span in enumerate(spans[:-1]):  # All except last
-            result = check_content_containment(span, last_span)
+            result = check_content_containment(span, last_span, last_content)
 
             status = "✅ FULLY CONTAINED" if result['is_complete_subset'] else "❌ PARTIAL/NOT CONTAINED"
             print(f"Span {i+1} → Span {len(spans)}: {status}")
@@ -251,6 +329,12 @@ def analyze_session(session: Dict) -> None:
 
     print(f"{'─' * 80}\n")
 
+    # Fingerprint each span's input messages once; adjacent comparisons reuse them
+    input_fps = []
+    for span in spans:
+        msgs = span.get('attributes.llm.input_messages', [])
+        input_fps.append([message_fingerprint(m) for m in msgs] if isinstance(msgs, list) else None)
+
     # Analyze each span
     for i, span in enumerate(spans):
         print(f"\n{'─' * 80}")
@@ -268,9 +352,9 @@ def analyze_session(session: Dict) -> None:
         if isinstance(input_msgs, list):
             print(f"Input messages: {len(input_msgs)} messages")
         if input_val:
-            print(f"Input value: {len(str(input_val))} chars")
+            print(f"Input value: {text_length(input_val)} chars")
         if output_msgs:
-            print(f"Output: {len(str(output_msgs))} chars")
+            print(f"Output: {text_length(output_msgs)} chars")
 
         # Compare with previous span
         if i > 0:
@@ -278,7 +362,7 @@ def analyze_session(session: Dict) -> None:
             prev_input_msgs = prev_span.get('attributes.llm.input_messages', [])
 
             if isinstance(input_msgs, list) and isinstance(prev_input_msgs, list):
-                comparison = compare_messages(prev_input_msgs, input_msgs)
+                comparison = compare_messages(prev_input_msgs, input_msgs, input_fps[i - 1], input_fps[i])
 
                 print(f"\n  📊 Comparison with Span {i}:")
                 print(f"    Messages in previous: {comparison['total_previous']}")
@@ -292,13 +376,12 @@ def analyze_session(session: Dict) -> None:
                 if comparison['new_count'] > 0:
                     print(f"\n  🆕 New messages:")
                     for j, new_msg in enumerate(comparison['new_messages'][:3]):  # Show first 3
-                        msg_dict = json.loads(new_msg) if new_msg.startswith('{') else new_msg
-                        if isinstance(msg_dict, dict):
-                            role = msg_dict.get('message.role', 'unknown')
-                            content = str(msg_dict.get('message.content', ''))[:150]
+                        if isinstance(new_msg, dict):
+                            role = new_msg.get('message.role', 'unknown')
+                            content = str(new_msg.get('message.content', ''))[:150]
                             print(f"      [{j+1}] {role}: {content}...")
                         else:
-                            print(f"      [{j+1}] {str(msg_dict)[:150]}...")
+                            print(f"      [{j+1}] {str(new_msg)[:150]}...")
         else:
             print(f"\n  📌 BASELINE SPAN (first in session)")
 
@@ -308,7 +391,7 @@ def analyze_session(session: Dict) -> None:
     print(f"{'═' * 80}")
 
     total_input_msgs = sum(len(s.get('attributes.llm.input_messages', [])) if isinstance(s.get('attributes.llm.input_messages'), list) else 0 for s in spans)
-    total_input_chars = sum(len(str(s.get('attributes.input.value', ''))) for s in spans)
+    total_input_chars = sum(text_length(s.get('attributes.input.value', '')) for s in spans)
 
     print(f"Total input messages across all spans: {total_input_msgs}")
     print(f"Total input characters: {total_input_chars:,}")
@@ -323,6 +406,40 @@ def analyze_session(session: Dict) -> None:
             print(f"Message growth factor: {growth_factor:.1f}x (from {first_span_msgs} to {last_span_msgs})")
 
 
+def render_session(session: Dict) -> str:
+    """Run analyze_session and return its report as a string (used by worker processes)."""
+    buffer = io.StringIO()
+    with redirect_stdout(buffer):
+        analyze_session(session)
+    return buffer.getvalue()
+
+
+def render_sessions_parallel(sessions: Iterator[Dict], jobs: int) -> Iterator[str]:
+    """Yield session reports in input order, rendered by a pool of worker processes.
+
+    Sessions are submitted through a bounded window, so only a few sessions
+    per worker are read from the file and held in memory at any time.
+    """
+    workers = jobs or os.cpu_count() or 1
+    max_in_flight = workers * SESSIONS_IN_FLIGHT_PER_WORKER
+    with Pool(processes=workers) as pool:
+        pending = deque()
+        for session in sessions:
+            pending.append(pool.apply_async(render_session, (session,)))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def non_negative_int(value: str) -> int:
+    """argparse type for counts that may be zero but not negative."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or greater, got {number}")
+    return number
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Compare spans within sessions to identify duplication",
@@ -339,6 +456,12 @@ def main():
         type=int,
         help='Analyze specific session number (default: all)'
     )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=non_negative_int,
+        default=1,
+        help='Worker processes when analyzing all sessions (default: 1, 0 = one per CPU)'
+    )
 
     args = parser.parse_args()
 
@@ -348,21 +471,32 @@ def main():
         sys.exit(1)
 
     print(f"Loading sessions from: {session_file}")
-    sessions = load_sessions(session_file)
-    print(f"Loaded {len(sessions)} session(s)")
+    # Sessions are streamed from the file and analyzed as they are read
+    sessions = iter_sessions(session_file)
 
     # Analyze sessions
     if args.session:
-        # Analyze specific session
-        target_sessions = [s for s in sessions if s['session_number'] == args.session]
-        if not target_sessions:
+        # Analyze specific session, stopping the read once it is found
+        target_session = next((s for s in sessions if s['session_number'] == args.session), None)
+        if target_session is None:
             print(f"❌ Error: Session {args.session} not found")
             sys.exit(1)
-        analyze_session(target_sessions[0])
+        analyze_session(target_session)
+        return
+
+    analyzed = 0
+    if args.jobs != 1:
+        # Analyze all sessions across worker processes; reports stay in session order
+        for report in render_sessions_parallel(sessions, args.jobs):
+            sys.stdout.write(report)
+            analyzed += 1
     else:
         # Analyze all sessions
         for session in sessions:
             analyze_session(session)
+            analyzed += 1
+
+    print(f"Analyzed {analyzed} session(s)")
 
 
 if __name__ == '__main__':
@@ -31,6 +31,7 @@ import argparse
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -46,6 +47,23 @@ except ImportError as e:
     sys.exit(1)
 
 
+# Rows formatted per CSV write, bounding memory on large trace dumps
+CSV_CHUNKSIZE = 50_000
+
+# pyarrow writer settings for trace parquet files: zstd-3 and dictionary
+# encoding suit the large, repetitive string columns in Arize span exports
+PARQUET_WRITE_OPTIONS = {
+    'engine': 'pyarrow',
+    'compression': 'zstd',
+    'compression_level': 3,
+    'row_group_size': 65_536,
+    'use_dictionary': True,
+}
+
+# Upper bound on concurrent day-window downloads from Arize
+MAX_FETCH_WORKERS = 8
+
+
 def parse_args():
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(
@@ -149,6 +167,51 @@ def format_file_size(size_bytes: int) -> str:
     return f"{size_bytes:.2f} PB"
 
 
+def day_windows(start_date: datetime, end_date: datetime) -> list[tuple[datetime, datetime]]:
+    """Split [start_date, end_date) into consecutive windows of at most one day."""
+    windows = []
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + timedelta(days=1), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+def fetch_windowed(client, export_params: dict, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+    """Fetch a date range as day-sized windows downloaded concurrently."""
+    windows = day_windows(start_date, end_date)
+    if len(windows) <= 1:
+        return client.export_model_to_df(**export_params, start_time=start_date, end_time=end_date)
+
+    print(f"   Splitting into {len(windows)} daily windows ({min(MAX_FETCH_WORKERS, len(windows))} parallel fetches)")
+
+    def fetch(window):
+        return client.export_model_to_df(**export_params, start_time=window[0], end_time=window[1])
+
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(windows))) as executor:
+        frames = [frame for frame in executor.map(fetch, windows) if frame is not None and not frame.empty]
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def compact_string_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast repetitive string columns to category to speed up writes.
+
+    Only object columns holding plain strings with fewer than one distinct
+    value per eight rows are converted (e.g. model_id, span kind, status).
+    """
+    max_unique = len(df) // 8
+    for column in df.select_dtypes(include='object').columns:
+        if pd.api.types.infer_dtype(df[column], skipna=True) != 'string':
+            continue
+        if df[column].nunique(dropna=True) < max_unique:
+            df[column] = df[column].astype('category')
+    return df
+
+
 def classify_span(row):
     """Classify span type for filtering."""
     input_val = row.get('attributes.input.value', '')
@@ -220,7 +283,7 @@ def export_traces(args):
         print(f"⏭️  Skipping download, loading from file...")
         print(f"   (Use --overwrite to re-download)")
         start_time = time.time()
-        df = pd.read_json(raw_file, lines=True)
+        df = compact_string_columns(pd.read_json(raw_file, lines=True))
         load_duration = time.time() - start_time
         print(f"✅ Loaded {len(df)} records in {load_duration:.2f}s")
     else:
@@ -254,9 +317,6 @@ def export_traces(args):
                 # Default to end of start date
                 end_date = start_date + timedelta(days=1)
 
-            export_params['start_time'] = start_date
-            export_params['end_time'] = end_date
-
             print(f"📅 Exporting traces from {start_date.date()} to {end_date.date()}")
         else:
             print("📅 Exporting all available traces")
@@ -265,7 +325,10 @@ def export_traces(args):
         print(f"🔄 Fetching trace data from Arize (model_id: {model_id})...")
         start_time = time.time()
         try:
-            df = client.export_model_to_df(**export_params)
+            if args.all:
+                df = client.export_model_to_df(**export_params)
+            else:
+                df = fetch_windowed(client, export_params, start_date, end_date)
             fetch_duration = time.time() - start_time
 
             if df.empty:
@@ -277,13 +340,14 @@ def export_traces(args):
                 return
 
             print(f"✅ Retrieved {len(df)} trace records in {fetch_duration:.2f}s")
+            df = compact_string_columns(df)
 
             # Save raw file
             print(f"💾 Saving raw data to: {raw_file.absolute()}")
             if args.format == 'parquet':
-                df.to_parquet(raw_file, index=False)
+                df.to_parquet(raw_file, index=False, **PARQUET_WRITE_OPTIONS)
             elif args.format == 'csv':
-                df.to_csv(raw_file, index=False)
+                df.to_csv(raw_file, index=False, chunksize=CSV_CHUNKSIZE)
             else:  # jsonl
                 df.to_json(raw_file, orient='records', lines=True)
 
@@ -312,9 +376,9 @@ def export_traces(args):
     # Save main dataset
     main_df = df[df['classification'] == 'main'].copy()
     if args.format == 'parquet':
-        main_df.to_parquet(output_path, index=False)
+        main_df.to_parquet(output_path, index=False, **PARQUET_WRITE_OPTIONS)
     elif args.format == 'csv':
-        main_df.to_csv(output_path, index=False)
+        main_df.to_csv(output_path, index=False, chunksize=CSV_CHUNKSIZE)
     else:  # jsonl
         main_df.to_json(output_path, orient='records', lines=True)
 
@@ -327,9 +391,9 @@ def export_traces(args):
         tools_output = output_path.parent / f"{output_path.stem}_tools{output_path.suffix}"
 
         if args.format == 'parquet':
-            tools_df.to_parquet(tools_output, index=False)
+            tools_df.to_parquet(tools_output, index=False, **PARQUET_WRITE_OPTIONS)
         elif args.format == 'csv':
-            tools_df.to_csv(tools_output, index=False)
+            tools_df.to_csv(tools_output, index=False, chunksize=CSV_CHUNKSIZE)
         else:  # jsonl
             tools_df.to_json(tools_output, orient='records', lines=True)
 
@@ -342,9 +406,9 @@ def export_traces(args):
         haiku_output = output_path.parent / f"{output_path.stem}_haiku_holdover{output_path.suffix}"
 
         if args.format == 'parquet':
-            haiku_df.to_parquet(haiku_output, index=False)
+            haiku_df.to_parquet(haiku_output, index=False, **PARQUET_WRITE_OPTIONS)
         elif args.format == 'csv':
-            haiku_df.to_csv(haiku_output, index=False)
+            haiku_df.to_csv(haiku_output, index=False, chunksize=CSV_CHUNKSIZE)
         else:  # jsonl
             haiku_df.to_json(haiku_output, orient='records', lines=True)
 
@@ -357,9 +421,9 @@ def export_traces(args):
         overhead_output = output_path.parent / f"{output_path.stem}_litellm_overhead{output_path.suffix}"
 
         if args.format == 'parquet':
-            overhead_df.to_parquet(overhead_output, index=False)
+            overhead_df.to_parquet(overhead_output, index=False, **PARQUET_WRITE_OPTIONS)
         elif args.format == 'csv':
-            overhead_df.to_csv(overhead_output, index=False)
+            overhead_df.to_csv(overhead_output, index=False, chunksize=CSV_CHUNKSIZE)
         else:  # jsonl
             overhead_df.to_json(overhead_output, orient='records', lines=True)
 
@@ -373,9 +437,9 @@ def export_traces(args):
         ancillary_output = output_path.parent / f"{output_path.stem}_ancillary{output_path.suffix}"
 
         if args.format == 'parquet':
-            ancillary_df.to_parquet(ancillary_output, index=False)
+            ancillary_df.to_parquet(ancillary_output, index=False, **PARQUET_WRITE_OPTIONS)
         elif args.format == 'csv':
-            ancillary_df.to_csv(ancillary_output, index=False)
+            ancillary_df.to_csv(ancillary_output, index=False, chunksize=CSV_CHUNKSIZE)
         else:  # jsonl
             ancillary_df.to_json(ancillary_output, orient='records', lines=True)
 
@@ -41,6 +41,13 @@ except ImportError as e:
     sys.exit(1)
 
 
+# Rows formatted per CSV write, bounding memory on large span dumps
+CSV_CHUNKSIZE = 50_000
+
+# zstd compresses the large input/output string columns far better than snappy
+PARQUET_COMPRESSION = 'zstd'
+
+
 def parse_args():
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(
@@ -320,9 +327,9 @@ def export_traces(args):
         # Save main dataset
         main_df = df[df['classification'] == 'main'].copy()
         if args.format == 'parquet':
-            main_df.to_parquet(output_path, index=False)
+            main_df.to_parquet(output_path, index=False, compression=PARQUET_COMPRESSION)
         elif args.format == 'csv':
-            main_df.to_csv(output_path, index=False)
+            main_df.to_csv(output_path, index=False, chunksize=CSV_CHUNKSIZE)
         else:  # jsonl
             main_df.to_json(output_path, orient='records', lines=True)
 
@@ -335,9 +342,9 @@ def export_traces(args):
             tools_output = output_path.parent / f"{output_path.stem}_tools{output_path.suffix}"
 
             if args.format == 'parquet':
-                tools_df.to_parquet(tools_output, index=False)
+                tools_df.to_parquet(tools_output, index=False, compression=PARQUET_COMPRESSION)
             elif args.format == 'csv':
-                tools_df.to_csv(tools_output, index=False)
+                tools_df.to_csv(tools_output, index=False, chunksize=CSV_CHUNKSIZE)
             else:  # jsonl
                 tools_df.to_json(tools_output, orient='records', lines=True)
 
@@ -350,9 +357,9 @@ def export_traces(args):
             haiku_output = output_path.parent / f"{output_path.stem}_haiku_holdover{output_path.suffix}"
 
             if args.format == 'parquet':
-                haiku_df.to_parquet(haiku_output, index=False)
+                haiku_df.to_parquet(haiku_output, index=False, compression=PARQUET_COMPRESSION)
             elif args.format == 'csv':
-                haiku_df.to_csv(haiku_output, index=False)
+                haiku_df.to_csv(haiku_output, index=False, chunksize=CSV_CHUNKSIZE)
             else:  # jsonl
                 haiku_df.to_json(haiku_output, orient='records', lines=True)
 
@@ -365,9 +372,9 @@ def export_traces(args):
             overhead_output = output_path.parent / f"{output_path.stem}_litellm_overhead{output_path.suffix}"
 
             if args.format == 'parquet':
-                overhead_df.to_parquet(overhead_output, index=False)
+                overhead_df.to_parquet(overhead_output, index=False, compression=PARQUET_COMPRESSION)
             elif args.format == 'csv':
-                overhead_df.to_csv(overhead_output, index=False)
+                overhead_df.to_csv(overhead_output, index=False, chunksize=CSV_CHUNKSIZE)
             else:  # jsonl
                 overhead_df.to_json(overhead_output, orient='records', lines=True)
 
@@ -381,9 +388,9 @@ def export_traces(args):
             ancillary_output = output_path.parent / f"{output_path.stem}_ancillary{output_path.suffix}"
 
             if args.format == 'parquet':
-                ancillary_df.to_parquet(ancillary_output, index=False)
+                ancillary_df.to_parquet(ancillary_output, index=False, compression=PARQUET_COMPRESSION)
             elif args.format == 'csv':
-                ancillary_df.to_csv(ancillary_output, index=False)
+                ancillary_df.to_csv(ancillary_output, index=False, chunksize=CSV_CHUNKSIZE)
             else:  # jsonl
                 ancillary_df.to_json(ancillary_output, orient='records', lines=True)
 
@@ -8,30 +8,62 @@ Usage:
     uv run main.py query --search "CWORK-797"
     uv run main.py query --session-id <session-id>
     uv run main.py query --search "linear" --export results.json
+    uv run main.py query --search "CWORK-797" "ENG2-481"
 """
 
 import argparse
+import hashlib
 import os
 import sys
-import json
-from typing import Dict, List
+import time
+from pathlib import Path
+from typing import Dict, List, Union
 
 try:
     import phoenix as px
     from phoenix.trace.dsl import SpanQuery
     import pandas as pd
+    import orjson
     from dotenv import load_dotenv
 except ImportError as e:
     print(f"❌ Missing required package: {e}")
     print("\nInstall with: cd scripts && uv sync")
     sys.exit(1)
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    from src.trace_utils import (
+        CACHE_DIR,
+        extract_session_ids as extract_metadata_session_ids,
+        read_cached_frame,
+        write_cached_frame,
+    )
+except ImportError:  # run directly, e.g. python src/query_traces.py
+    from trace_utils import (
+        CACHE_DIR,
+        extract_session_ids as extract_metadata_session_ids,
+        read_cached_frame,
+        write_cached_frame,
+    )
+
 load_dotenv()
 
+DEFAULT_PHOENIX_URL = "http://98.149.54.126:6106"
+
+# Fetched span frames are cached in one file per Phoenix server and project,
+# overwritten in place, so back-to-back queries skip the 10k-span download;
+# entries older than the TTL are re-fetched
+SPAN_CACHE_DIR = CACHE_DIR
+SPAN_CACHE_TTL_SECONDS = 15 * 60
+
 
 def get_phoenix_client():
     """Get Phoenix client."""
-    phoenix_url = os.getenv("PHOENIX_BASE_URL", "http://98.149.54.126:6106")
+    phoenix_url = os.getenv("PHOENIX_BASE_URL", DEFAULT_PHOENIX_URL)
     print(f"🔗 Connecting to Phoenix at {phoenix_url}")
 
     try:
@@ -43,19 +75,73 @@ def get_phoenix_client():
         sys.exit(1)
 
 
-def query_by_search(client, search_string: str, project_name: str = "dev-agent-lens") -> pd.DataFrame:
-    """Query traces containing search string (client-side filtering)."""
+def span_cache_path(project_name: str) -> Path:
+    """Return the span cache file for the configured Phoenix server and project."""
+    phoenix_url = os.getenv("PHOENIX_BASE_URL", DEFAULT_PHOENIX_URL)
+    server_key = hashlib.sha256(phoenix_url.encode()).hexdigest()[:8]
+    return SPAN_CACHE_DIR / f"phoenix_spans_{server_key}_{project_name}.pkl"
+
+
+def fetch_spans(client, project_name: str, refresh: bool = False) -> pd.DataFrame:
+    """
+    Fetch up to 10k recent spans, reusing the on-disk cache when fresh.
+
+    An unreadable cache file is treated as a miss.
+    """
+    cache_file = span_cache_path(project_name)
+
+    if not refresh and cache_file.exists():
+        age = time.time() - cache_file.stat().st_mtime
+        if age < SPAN_CACHE_TTL_SECONDS:
+            df = read_cached_frame(cache_file)
+            if df is not None:
+                print(f"📦 Using cached spans ({age:.0f}s old, --refresh to re-fetch)")
+                return df
+
+    print("📥 Fetching spans from Phoenix...")
+    df = client.get_spans_dataframe(
+        project_name=project_name,
+        timeout=120,
+        limit=10000  # Fetch up to 10k spans
+    )
+
+    if df is not None and not df.empty:
+        write_cached_frame(cache_file, df)
+    return df
+
+
+def _match_any_term(texts: pd.Series, terms: List[str]) -> pd.Series:
+    """
+    Return a boolean mask of texts containing any of the (lowercase) terms.
+
+    Several terms are matched in a single pass with an Aho-Corasick automaton
+    when pyahocorasick is installed; otherwise each term is scanned in turn.
+    """
+    if len(terms) > 1 and ahocorasick is not None and all(terms):
+        automaton = ahocorasick.Automaton()
+        for term in terms:
+            automaton.add_word(term, term)
+        automaton.make_automaton()
+        return texts.fillna('').map(lambda text: next(automaton.iter(text), None) is not None).astype(bool)
+
+    mask = texts.str.contains(terms[0], na=False, regex=False)
+    for term in terms[1:]:
+        mask |= texts.str.contains(term, na=False, regex=False)
+    return mask
+
+
+def query_by_search(
+    client, search_string: Union[str, List[str]], project_name: str = "dev-agent-lens", refresh: bool = False
+) -> pd.DataFrame:
+    """Query traces containing any of the search strings (client-side filtering)."""
+    terms = [search_string] if isinstance(search_string, str) else list(search_string)
+    search_string = "', '".join(terms)
     print(f"🔍 Searching for: '{search_string}'")
     print(f"📦 Project: {project_name}")
 
     try:
         # Fetch all spans from project
-        print("📥 Fetching spans from Phoenix...")
-        df = client.get_spans_dataframe(
-            project_name=project_name,
-            timeout=120,
-            limit=10000  # Fetch up to 10k spans
-        )
+        df = fetch_spans(client, project_name, refresh)
 
         if df.empty:
             print("❌ No spans found in project")
@@ -65,21 +151,28 @@ def query_by_search(client, search_string: str, project_name: str = "dev-agent-l
 
         # Client-side filter for search string
         print(f"🔍 Filtering for '{search_string}'...")
-        search_lower = search_string.lower()
-        mask = pd.Series([False] * len(df), index=df.index)
+        search_terms = [term.lower() for term in terms]
 
         # Search in input and output columns (use attributes.* column names)
-        search_columns = ['attributes.input.value', 'attributes.output.value']
-        for col in search_columns:
-            if col in df.columns:
-                mask |= df[col].astype(str).str.lower().str.contains(search_lower, na=False, regex=False)
-
-        filtered = df[mask]
+        search_columns = [
+            col for col in ('attributes.input.value', 'attributes.output.value') if col in df.columns
+        ]
+        if search_columns:
+            # Join the columns into one Series so it is lowercased and scanned once;
+            # the unit separator keeps a match from spanning two columns
+            combined = df[search_columns[0]].astype('string')
+            for col in search_columns[1:]:
+                combined = combined.str.cat(df[col].astype('string'), sep='\x1f', na_rep='')
+            mask = _match_any_term(combined.str.lower(), search_terms)
+            filtered = df[mask.to_numpy(dtype=bool)]
+        else:
+            filtered = df.iloc[0:0]
 
-        if filtered.empty:
+        match_count = len(filtered)
+        if match_count == 0:
             print(f"❌ No traces found containing: '{search_string}'")
         else:
-            print(f"✅ Found {len(filtered)} matching span(s)")
+            print(f"✅ Found {match_count} matching span(s)")
 
         return filtered
 
@@ -90,32 +183,30 @@ def query_by_search(client, search_string: str, project_name: str = "dev-agent-l
         return pd.DataFrame()
 
 
-def query_by_session_id(client, session_id: str, project_name: str = "dev-agent-lens") -> pd.DataFrame:
-    """Query traces by exact session ID (client-side filtering)."""
+def query_by_session_id(
+    client, session_id: str, project_name: str = "dev-agent-lens", refresh: bool = False
+) -> pd.DataFrame:
+    """Query traces by exact session ID (server-side filtering, client-side fallback)."""
     print(f"🔍 Querying for session_id: {session_id}")
     print(f"📦 Project: {project_name}")
 
     try:
-        # Fetch all spans from project
-        print("📥 Fetching spans from Phoenix...")
-        df = client.get_spans_dataframe(
-            project_name=project_name,
-            timeout=120,
-            limit=10000  # Fetch up to 10k spans
-        )
-
-        if df.empty:
-            print("❌ No spans found in project")
-            return df
-
-        print(f"✅ Retrieved {len(df)} spans")
-
-        # Filter by trace_id (session ID in Phoenix)
-        print(f"🔍 Filtering for trace_id (session): '{session_id}'...")
-        if 'context.trace_id' in df.columns:
-            filtered = df[df['context.trace_id'] == session_id]
-        else:
-            filtered = pd.DataFrame()
+        # Filter on trace_id (session ID in Phoenix) server-side so only the
+        # matching spans are transferred
+        print("📥 Fetching session spans from Phoenix...")
+        try:
+            query = SpanQuery().where(f"trace_id == {session_id!r}")
+            filtered = client.query_spans(
+                query,
+                project_name=project_name,
+                timeout=120,
+                limit=10000  # Match the client-side path; the client default is 1000
+            )
+            if filtered is None:
+                filtered = pd.DataFrame()
+        except Exception as e:
+            print(f"⚠️  Server-side filter failed ({e}), falling back to client-side filtering")
+            filtered = _filter_session_client_side(client, session_id, project_name, refresh)
 
         if filtered.empty:
             print(f"❌ No traces found for session: {session_id}")
@@ -131,64 +222,69 @@ def query_by_session_id(client, session_id: str, project_name: str = "dev-agent-
         return pd.DataFrame()
 
 
-def extract_session_id(row) -> str:
+def _filter_session_client_side(client, session_id: str, project_name: str, refresh: bool = False) -> pd.DataFrame:
+    """Fetch recent spans and filter them by trace_id locally."""
+    df = fetch_spans(client, project_name, refresh)
+
+    if df.empty:
+        print("❌ No spans found in project")
+        return df
+
+    print(f"✅ Retrieved {len(df)} spans")
+
+    print(f"🔍 Filtering for trace_id (session): '{session_id}'...")
+    if 'context.trace_id' in df.columns:
+        return df[df['context.trace_id'] == session_id]
+    return pd.DataFrame()
+
+
+def extract_session_ids(df: pd.DataFrame) -> pd.Series:
     """
-    Extract Claude Code session ID from metadata fields.
+    Extract Claude Code session IDs for every row from metadata fields.
 
     Checks multiple locations for session ID with 'session_' pattern:
     - metadata.user_id
     - metadata.user_api_key_end_user_id
     - metadata.requester_metadata.user_id
-    """
-    metadata = row.get('attributes.metadata')
-
-    if not metadata or not isinstance(metadata, dict):
-        # Fallback to trace_id if no metadata
-        return row.get('context.trace_id', 'unknown')
-
-    # Try Phoenix format: metadata.user_id with _session_ pattern
-    user_id = metadata.get('user_id')
-    if user_id and 'session_' in str(user_id):
-        return str(user_id).split('session_')[-1]
 
-    # Try Arize format: user_api_key_end_user_id
-    user_id = metadata.get('user_api_key_end_user_id')
-    if user_id and 'session_' in str(user_id):
-        return str(user_id).split('session_')[-1]
+    Only dict metadata is considered. Rows without a session ID fall back to
+    trace_id.
+    """
+    if 'context.trace_id' in df.columns:
+        trace_ids = df['context.trace_id']
+    else:
+        trace_ids = pd.Series('unknown', index=df.index)
 
-    # Also try requester_metadata.user_id (Arize format)
-    req_meta = metadata.get('requester_metadata', {})
-    if isinstance(req_meta, dict):
-        user_id = req_meta.get('user_id')
-        if user_id and 'session_' in str(user_id):
-            return str(user_id).split('session_')[-1]
+    if 'attributes.metadata' not in df.columns:
+        return trace_ids
 
-    # Fallback to trace_id
-    return row.get('context.trace_id', 'unknown')
+    session_ids = extract_metadata_session_ids(df['attributes.metadata'], include_strings=False)
+    return session_ids.astype(object).fillna(trace_ids)
 
 
-def group_by_session(df: pd.DataFrame) -> Dict[str, List[Dict]]:
+def group_by_session(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
     """
     Group traces by Claude Code session ID.
 
     Extracts session ID from metadata fields, falls back to trace_id.
+    Groups stay DataFrames; rows are only converted to dicts when exported.
     """
     if df.empty:
         return {}
 
     # Extract session ID for each row
-    df['session_id'] = df.apply(extract_session_id, axis=1)
+    df['session_id'] = extract_session_ids(df)
 
     # Group by session ID
     grouped = {}
     for session_id, group_df in df.groupby('session_id'):
         if pd.notna(session_id):
-            grouped[str(session_id)] = group_df.to_dict('records')
+            grouped[str(session_id)] = group_df
 
     return grouped
 
 
-def print_results(grouped: Dict[str, List[Dict]], verbose: bool = False):
+def print_results(grouped: Dict[str, pd.DataFrame], verbose: bool = False):
     """Print results."""
     if not grouped:
         print("\n❌ No results")
@@ -205,7 +301,7 @@ def print_results(grouped: Dict[str, List[Dict]], verbose: bool = False):
         print("\n" + "="*80)
         for session_id, traces in grouped.items():
             print(f"\nSession: {session_id}")
-            for i, trace in enumerate(traces[:3], 1):  # Show first 3
+            for i, trace in enumerate(traces.head(3).to_dict('records'), 1):  # Show first 3
                 print(f"  Trace {i}:")
                 print(f"    Span: {trace.get('span_id', 'N/A')[:16]}...")
                 print(f"    Name: {trace.get('name', 'N/A')}")
@@ -215,15 +311,18 @@ def print_results(grouped: Dict[str, List[Dict]], verbose: bool = False):
         print("\n💡 Use --verbose for details")
 
 
-def export_results(grouped: Dict[str, List[Dict]], output_path: str):
+def export_results(grouped: Dict[str, pd.DataFrame], output_path: str):
     """Export to JSON."""
     if not grouped:
         print("⚠️  No data to export")
         return
 
     try:
-        with open(output_path, 'w') as f:
-            json.dump(grouped, f, indent=2, default=str)
+        records = {session_id: traces.to_dict('records') for session_id, traces in grouped.items()}
+        options = (orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+                   | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS)
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(records, option=options, default=str))
 
         total = sum(len(traces) for traces in grouped.values())
         print(f"\n💾 Exported to: {output_path}")
@@ -234,10 +333,11 @@ def export_results(grouped: Dict[str, List[Dict]], output_path: str):
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Query Claude Code traces from Phoenix")
-    parser.add_argument("--search", help="Search string in trace content")
+    parser.add_argument("--search", nargs='+', help="Search string(s) in trace content (matches any)")
     parser.add_argument("--session-id", help="Query by session ID")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
     parser.add_argument("--export", help="Export to JSON file")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached spans and re-fetch from Phoenix")
     return parser.parse_args()
 
 
@@ -252,9 +352,9 @@ def main():
 
     # Query
     if args.session_id:
-        df = query_by_session_id(client, args.session_id)
+        df = query_by_session_id(client, args.session_id, refresh=args.refresh)
     else:
-        df = query_by_search(client, args.search)
+        df = query_by_search(client, args.search, refresh=args.refresh)
 
     # Group and display
     grouped = group_by_session(df)
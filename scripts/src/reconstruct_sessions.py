@@ -18,75 +18,105 @@ Usage:
     # Custom output path
     uv run main.py reconstruct --output sessions.jsonl
 """
+import hashlib
 import json
+import sys
 import pandas as pd
 from datetime import timedelta
 from typing import Dict, List, Any
 import argparse
 from pathlib import Path
 
+try:
+    from src.trace_utils import (
+        CACHE_DIR,
+        extract_session_ids,
+        read_cached_frame,
+        read_jsonl,
+        write_cached_frame,
+    )
+except ImportError:  # run directly, e.g. python src/reconstruct_sessions.py
+    from trace_utils import (
+        CACHE_DIR,
+        extract_session_ids,
+        read_cached_frame,
+        read_jsonl,
+        write_cached_frame,
+    )
+
+# Span columns shown in the session timeline, with the value used when a column is absent
+TIMELINE_COLUMNS = {
+    'start_time': None,
+    'name': 'unknown',
+    'attributes.openinference.span.kind': '',
+    'context.span_id': '',
+    'parent_id': '',
+    'attributes.input.value': '',
+    'attributes.output.value': '',
+    'attributes.llm.input_messages': None,
+    'attributes.llm.output_messages': None,
+}
+
+# Parsed trace files are cached per resolved input path and reused while the
+# cache is newer than the trace files it was built from
+TRACE_CACHE_DIR = CACHE_DIR
+
+
+def trace_cache_path(filepath: str) -> Path:
+    """Return the parsed-trace cache file for a trace file."""
+    resolved = Path(filepath).resolve()
+    path_key = hashlib.sha256(str(resolved).encode()).hexdigest()[:16]
+    return TRACE_CACHE_DIR / f"parsed_{resolved.stem}_{path_key}.pkl"
+
+
+def load_trace_data(filepath: str, use_cache: bool = True) -> pd.DataFrame:
+    """Load JSONL trace data into a DataFrame, including tools file if it exists.
+
+    The parsed frame is cached under ~/.cache/dev-agent-lens and reused while it
+    is newer than the trace files it was built from.
+    """
+    tools_path = Path(filepath).parent / Path(filepath).name.replace('traces.jsonl', 'traces_tools.jsonl')
+    cache_path = trace_cache_path(filepath)
+
+    if use_cache and cache_path.exists():
+        sources = [Path(filepath)] + ([tools_path] if tools_path.exists() else [])
+        if cache_path.stat().st_mtime >= max(source.stat().st_mtime for source in sources):
+            df = read_cached_frame(cache_path)
+            if df is not None:
+                print(f"  📦 Using cached trace data: {cache_path} (--no-cache to re-parse)")
+                return df
 
-def load_trace_data(filepath: str) -> pd.DataFrame:
-    """Load JSONL trace data into a DataFrame, including tools file if it exists."""
-    df = pd.read_json(filepath, lines=True)
+    df = read_jsonl(filepath)
 
     # Also load tools file if it exists (to get complete session)
-    tools_path = Path(filepath).parent / Path(filepath).name.replace('traces.jsonl', 'traces_tools.jsonl')
     if tools_path.exists():
         print(f"  📎 Also loading tools: {tools_path.name}")
-        tools_df = pd.read_json(tools_path, lines=True)
+        tools_df = read_jsonl(tools_path)
         df = pd.concat([df, tools_df], ignore_index=True)
         print(f"  ✅ Combined: {len(df)} total spans")
 
-    # Convert timestamps to datetime
-    if 'start_time' in df.columns:
-        df['start_time'] = pd.to_datetime(df['start_time'], unit='ms', errors='coerce')
-    if 'end_time' in df.columns:
-        df['end_time'] = pd.to_datetime(df['end_time'], unit='ms', errors='coerce')
-
-    # Sort by time
-    df = df.sort_values('start_time')
+    # Convert timestamps to datetime (epoch ms as exported, or ISO strings)
+    for column in ('start_time', 'end_time'):
+        if column in df.columns:
+            if pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = pd.to_datetime(df[column], unit='ms', errors='coerce')
+            else:
+                df[column] = pd.to_datetime(df[column], errors='coerce')
 
-    return df
+    # Trace and parent IDs repeat across many spans; store them as categories
+    for column in ('context.trace_id', 'parent_id'):
+        if column in df.columns:
+            df[column] = df[column].astype('category')
 
+    # Sort by time (exports are often already in order; the check is O(n)).
+    # Session groups keep this order, so nothing downstream sorts again.
+    if not df['start_time'].is_monotonic_increasing:
+        df = df.sort_values('start_time')
 
-def extract_session_id(metadata) -> str | None:
-    """Extract session ID from metadata if available."""
-    if pd.isna(metadata):
-        return None
-
-    # Handle string representation of dict (Phoenix format)
-    if isinstance(metadata, str):
-        if 'session_' in metadata:
-            # Extract from pattern like: _session_ae99895f-9fad-4453-bb91-1005e8ccc4d3
-            parts = metadata.split('session_')
-            if len(parts) > 1:
-                # Get the session ID (everything after 'session_')
-                session_id = parts[-1].rstrip("'}\"")  # Remove trailing quotes/braces
-                return session_id
-        return None
-
-    if not isinstance(metadata, dict):
-        return None
-
-    # Try Phoenix format: metadata.user_id with _session_ pattern
-    user_id = metadata.get('user_id')
-    if user_id and 'session_' in str(user_id):
-        return str(user_id).split('session_')[-1]
-
-    # Try Arize format: user_api_key_end_user_id
-    user_id = metadata.get('user_api_key_end_user_id')
-    if user_id and 'session_' in user_id:
-        return user_id.split('session_')[-1]
-
-    # Also try requester_metadata.user_id (Arize format)
-    req_meta = metadata.get('requester_metadata', {})
-    if isinstance(req_meta, dict):
-        user_id = req_meta.get('user_id')
-        if user_id and 'session_' in user_id:
-            return user_id.split('session_')[-1]
+    if use_cache:
+        write_cached_frame(cache_path, df)
 
-    return None
+    return df
 
 
 def reconstruct_by_session_id(df: pd.DataFrame) -> List[pd.DataFrame]:
@@ -97,9 +127,9 @@ def reconstruct_by_session_id(df: pd.DataFrame) -> List[pd.DataFrame]:
 
     # Extract session IDs - check both metadata columns
     if 'metadata' in df.columns:
-        df['session_id'] = df['metadata'].apply(extract_session_id)
+        df['session_id'] = extract_session_ids(df['metadata'])
     elif 'attributes.metadata' in df.columns:
-        df['session_id'] = df['attributes.metadata'].apply(extract_session_id)
+        df['session_id'] = extract_session_ids(df['attributes.metadata'])
     else:
         print("❌ No metadata column found in dataframe")
         return []
@@ -113,82 +143,79 @@ def reconstruct_by_session_id(df: pd.DataFrame) -> List[pd.DataFrame]:
         print("❌ No spans have session IDs. Cannot reconstruct sessions.")
         return []
 
-    # Group by session ID
-    sessions = []
-    for session_id, session_df in df[df['session_id'].notna()].groupby('session_id'):
-        sessions.append(session_df.copy())
+    # Group by session ID; the groups are only read, so they are not copied
+    sessions = [session_df for _, session_df in df[df['session_id'].notna()].groupby('session_id')]
 
     print(f"\nDetected {len(sessions)} sessions")
 
     # Analyze each session
     for i, session_df in enumerate(sessions[:10]):  # Limit to first 10
         session_id = session_df['session_id'].iloc[0]
-        print(f"\n{'─' * 80}")
-        print(f"SESSION {i+1}: {session_id}")
-        print(f"{'─' * 80}")
-        print(f"Spans: {len(session_df)}")
+
+        # Collect the session report and write it in one call instead of a print per line
+        lines = []
+        lines.append(f"\n{'─' * 80}")
+        lines.append(f"SESSION {i+1}: {session_id}")
+        lines.append(f"{'─' * 80}")
+        lines.append(f"Spans: {len(session_df)}")
 
         # Time range
         start = session_df['start_time'].min()
         end = session_df['end_time'].max()
         duration = (end - start).total_seconds() if pd.notna(start) and pd.notna(end) else 0
-        print(f"Duration: {duration:.2f}s ({start} to {end})")
+        lines.append(f"Duration: {duration:.2f}s ({start} to {end})")
 
         # Span types
         span_kinds = session_df['attributes.openinference.span.kind'].value_counts()
-        print(f"\nSpan types:")
+        lines.append(f"\nSpan types:")
         for kind, count in span_kinds.items():
-            print(f"  {kind}: {count}")
+            lines.append(f"  {kind}: {count}")
 
         # Unique traces in this session
         traces = session_df['context.trace_id'].nunique()
-        print(f"Unique traces: {traces}")
+        lines.append(f"Unique traces: {traces}")
+
+        # Span durations for the whole session in one vectorized pass (missing times → 0)
+        span_durations = (session_df['end_time'] - session_df['start_time']).dt.total_seconds().fillna(0)
+
+        # Read the timeline fields as plain tuples rather than a Series per row
+        missing_columns = {c: default for c, default in TIMELINE_COLUMNS.items() if c not in session_df.columns}
+        timeline = session_df.assign(**missing_columns)[list(TIMELINE_COLUMNS)]
 
         # Show timeline with input/output
-        print(f"\n📋 Timeline:")
-        for idx, row in session_df.iterrows():
-            span_time = row['start_time'].strftime('%H:%M:%S.%f')[:-3]
-            span_name = row.get('name', 'unknown')
-            span_kind = row.get('attributes.openinference.span.kind', '')
-            span_id = row.get('context.span_id', '')[:8]
-            parent_id = row.get('parent_id', '')
-
-            # Get duration
-            span_start = row['start_time']
-            span_end = row['end_time']
-            span_duration = (span_end - span_start).total_seconds() if pd.notna(span_start) and pd.notna(span_end) else 0
-
-            print(f"\n  [{span_time}] {span_name} ({span_kind}) - {span_id} [{span_duration:.2f}s]")
-            if parent_id and isinstance(parent_id, str):
-                print(f"    Parent: {parent_id[:8]}")
+        lines.append(f"\n📋 Timeline:")
+        for row, span_duration in zip(timeline.itertuples(index=False, name=None), span_durations):
+            span_start, span_name, span_kind, span_id, parent_id, input_val, output_val, input_msgs, output_msgs = row
+            span_time = span_start.strftime('%H:%M:%S.%f')[:-3]
+            span_id = span_id[:8]
 
-            # Get input/output
-            input_val = row.get('attributes.input.value', '')
-            output_val = row.get('attributes.output.value', '')
-            input_msgs = row.get('attributes.llm.input_messages', None)
-            output_msgs = row.get('attributes.llm.output_messages', None)
+            lines.append(f"\n  [{span_time}] {span_name} ({span_kind}) - {span_id} [{span_duration:.2f}s]")
+            if parent_id and isinstance(parent_id, str):
+                lines.append(f"    Parent: {parent_id[:8]}")
 
             # Show input
             if input_val:
                 input_str = str(input_val)
                 preview = input_str[:200].replace('\n', ' ')
-                print(f"    📥 Input ({len(input_str)} chars): {preview}{'...' if len(input_str) > 200 else ''}")
+                lines.append(f"    📥 Input ({len(input_str)} chars): {preview}{'...' if len(input_str) > 200 else ''}")
             elif input_msgs and isinstance(input_msgs, list) and len(input_msgs) > 0:
-                print(f"    📥 Input Messages: {len(input_msgs)} message(s)")
+                lines.append(f"    📥 Input Messages: {len(input_msgs)} message(s)")
                 for msg_idx, msg in enumerate(input_msgs[:2]):
                     if isinstance(msg, dict):
                         role = msg.get('message.role', 'unknown')
                         content = str(msg.get('message.content', ''))[:150].replace('\n', ' ')
-                        print(f"       [{msg_idx+1}] {role}: {content}...")
+                        lines.append(f"       [{msg_idx+1}] {role}: {content}...")
 
             # Show output
             if output_val:
                 output_str = str(output_val)
                 preview = output_str[:200].replace('\n', ' ')
-                print(f"    📤 Output ({len(output_str)} chars): {preview}{'...' if len(output_str) > 200 else ''}")
+                lines.append(f"    📤 Output ({len(output_str)} chars): {preview}{'...' if len(output_str) > 200 else ''}")
             elif output_msgs and isinstance(output_msgs, str):
                 preview = str(output_msgs)[:200].replace('\n', ' ')
-                print(f"    📤 Output: {preview}...")
+                lines.append(f"    📤 Output: {preview}...")
+
+        sys.stdout.write('\n'.join(lines) + '\n')
 
     return sessions
 
@@ -202,21 +229,27 @@ def save_reconstructed_sessions(conversations: List[pd.DataFrame], output_path:
 
     sessions_data = []
     for i, conv_df in enumerate(conversations):
-        # Convert timestamps back to ISO format for JSON serialization
-        conv_df_copy = conv_df.copy()
-        if 'start_time' in conv_df_copy.columns:
-            conv_df_copy['start_time'] = conv_df_copy['start_time'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
-        if 'end_time' in conv_df_copy.columns:
-            conv_df_copy['end_time'] = conv_df_copy['end_time'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+        # Convert timestamps back to ISO format for JSON serialization; assign()
+        # swaps in the formatted columns without deep-copying the span payloads
+        formatted_times = {
+            column: conv_df[column].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+            for column in ('start_time', 'end_time')
+            if column in conv_df.columns
+        }
+        serializable_df = conv_df.assign(**formatted_times)
+
+        # Session time bounds, reduced once and reused for the duration
+        start = conv_df['start_time'].min()
+        end = conv_df['end_time'].max()
 
         session = {
             'session_number': i + 1,
             'span_count': len(conv_df),
-            'start_time': str(conv_df['start_time'].min()),
-            'end_time': str(conv_df['end_time'].max()),
-            'duration_seconds': (conv_df['end_time'].max() - conv_df['start_time'].min()).total_seconds(),
+            'start_time': str(start),
+            'end_time': str(end),
+            'duration_seconds': (end - start).total_seconds(),
             'unique_traces': conv_df['context.trace_id'].nunique(),
-            'spans': conv_df_copy.to_dict('records')
+            'spans': serializable_df.to_dict('records')
         }
         sessions_data.append(session)
 
@@ -271,6 +304,11 @@ def main():
         type=str,
         help='Output file path for reconstructed sessions (default: auto-detect based on input)'
     )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Re-parse the trace file instead of using the cached parse'
+    )
 
     args = parser.parse_args()
 
@@ -300,7 +338,7 @@ def main():
         output_file = input_file.parent / input_file.name.replace('traces', 'sessions')
 
     print(f"Loading trace data from: {input_file}")
-    df = load_trace_data(str(input_file))
+    df = load_trace_data(str(input_file), use_cache=not args.no_cache)
     print(f"Loaded {len(df)} spans")
 
     # Reconstruct sessions by session ID
@@ -0,0 +1,120 @@
+"""
+Helpers shared by the trace analysis scripts.
+
+orjson is a required dependency (see scripts/pyproject.toml); the stdlib json
+parser is only used for lines orjson rejects.
+"""
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import orjson
+import pandas as pd
+
+# Read buffer for streaming trace JSONL files
+READ_BUFFER_SIZE = 1 << 16
+
+# Per-user cache for fetched spans and parsed trace files
+CACHE_DIR = Path.home() / ".cache" / "dev-agent-lens"
+
+
+
+def loads_json(data):
+    """Decode JSON with orjson, falling back to stdlib json for lines it rejects.
+
+    orjson rejects the bare NaN tokens json.dumps writes for missing pandas
+    values (as in reconstruct_sessions output), so those lines are decoded by
+    the stdlib parser.
+    """
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def read_jsonl(filepath) -> pd.DataFrame:
+    """Read a JSONL file into a DataFrame, decoding each line with loads_json."""
+    with open(filepath, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        records = [loads_json(line) for line in f if line.strip()]
+    return pd.DataFrame.from_records(records)
+
+
+def write_bytes_atomic(path, data: bytes) -> None:
+    """Write data to path via a temporary file in the same directory.
+
+    The temporary file is renamed over path with os.replace, so readers see
+    either the previous file or the complete new one, never a partial write.
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def read_cached_frame(path: Path) -> pd.DataFrame | None:
+    """Unpickle a cached DataFrame, or return None if the file cannot be read.
+
+    The cache is a pickle so dict/list columns round-trip unchanged.
+    """
+    try:
+        return pd.read_pickle(path)
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable cache {path}: {e}")
+        return None
+
+
+def write_cached_frame(path: Path, df: pd.DataFrame) -> None:
+    """Pickle a DataFrame to path atomically, warning instead of failing."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_bytes_atomic(path, pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+    except (OSError, pickle.PicklingError) as e:
+        print(f"⚠️  Could not write cache {path}: {e}")
+
+
+def session_suffix(values: pd.Series) -> pd.Series:
+    """Return the text after the last 'session_' marker, or NA where absent."""
+    values = values.astype('string')
+    has_session = values.str.contains('session_', na=False, regex=False)
+    return values.where(has_session).str.replace(r'(?s)^.*session_', '', regex=True)
+
+
+def extract_session_ids(metadata: pd.Series, include_strings: bool = True) -> pd.Series:
+    """Extract session IDs from a metadata column using vectorized string ops.
+
+    Checks, in order of precedence:
+    - String representation of dict (Phoenix format), unless include_strings is False
+    - metadata.user_id with _session_ pattern (Phoenix format)
+    - metadata.user_api_key_end_user_id (Arize format)
+    - metadata.requester_metadata.user_id (Arize format)
+
+    Rows without a session ID are NA.
+    """
+    kinds = metadata.map(type)
+
+    if include_strings:
+        # Extract from pattern like: _session_ae99895f-9fad-4453-bb91-1005e8ccc4d3'}
+        # and remove trailing quotes/braces
+        session_ids = session_suffix(metadata[kinds == str]).str.rstrip("'}\"")
+    else:
+        session_ids = pd.Series(pd.NA, index=metadata.index[:0], dtype='string')
+
+    # Pull out only the three candidate fields; metadata dicts carry many other keys
+    dicts = metadata[kinds == dict]
+    requester_metadata = dicts.map(lambda m: m.get('requester_metadata'))
+    candidates = (
+        dicts.map(lambda m: m.get('user_id')),
+        dicts.map(lambda m: m.get('user_api_key_end_user_id')),
+        requester_metadata.map(lambda r: r.get('user_id') if isinstance(r, dict) else None),
+    )
+    for values in candidates:
+        session_ids = session_ids.combine_first(session_suffix(values))
+
+    return session_ids.reindex(metadata.index)
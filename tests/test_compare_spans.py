@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test suite for compare_spans.py
+
+Tests the chunked session reader, the message comparison helpers and the
+--jobs worker pool.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from src import compare_spans
+from src.compare_spans import (
+    compare_messages,
+    iter_sessions,
+    load_sessions,
+    non_negative_int,
+    render_session,
+    render_sessions_parallel,
+)
+
+
+def write_lines(path: Path, lines: list[str], trailing_newline: bool = True) -> Path:
+    """Write raw JSONL lines to a file."""
+    content = "\n".join(lines) + ("\n" if trailing_newline else "")
+    path.write_text(content)
+    return path
+
+
+@pytest.fixture
+def sessions():
+    """Sessions whose encoded lines are much longer than the test chunk size."""
+    return [
+        {"session_number": i + 1, "spans": [{"name": f"span-{i}-{j}", "text": "x" * 40} for j in range(3)]}
+        for i in range(4)
+    ]
+
+
+class TestIterSessions:
+    """Test streaming sessions from JSONL in fixed-size chunks."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+    def test_lines_crossing_chunk_boundaries(self, tmp_path, monkeypatch, sessions, chunk_size):
+        """Test that lines split across reads are reassembled."""
+        monkeypatch.setattr(compare_spans, "READ_CHUNK_SIZE", chunk_size)
+        path = write_lines(tmp_path / "sessions.jsonl", [json.dumps(s) for s in sessions])
+
+        assert list(iter_sessions(path)) == sessions
+
+    def test_blank_lines_skipped(self, tmp_path, monkeypatch, sessions):
+        """Test that empty and whitespace-only lines are ignored."""
+        monkeypatch.setattr(compare_spans, "READ_CHUNK_SIZE", 5)
+        lines = ["", json.dumps(sessions[0]), "   ", "", json.dumps(sessions[1]), "\t"]
+        path = write_lines(tmp_path / "sessions.jsonl", lines)
+
+        assert list(iter_sessions(path)) == sessions[:2]
+
+    @pytest.mark.parametrize("chunk_size", [3, 1 << 20])
+    def test_no_trailing_newline(self, tmp_path, monkeypatch, sessions, chunk_size):
+        """Test that the final line is yielded without a trailing newline."""
+        monkeypatch.setattr(compare_spans, "READ_CHUNK_SIZE", chunk_size)
+        path = write_lines(tmp_path / "sessions.jsonl", [json.dumps(s) for s in sessions], trailing_newline=False)
+
+        assert list(iter_sessions(path)) == sessions
+
+    def test_nan_tokens_fall_back_to_stdlib(self, tmp_path, monkeypatch):
+        """Test that bare NaN tokens (written by json.dumps) still decode."""
+        monkeypatch.setattr(compare_spans, "READ_CHUNK_SIZE", 4)
+        session = {"session_number": 1, "spans": [{"attributes.output.value": float("nan")}]}
+        line = json.dumps(session)
+        assert "NaN" in line
+        path = write_lines(tmp_path / "sessions.jsonl", [line, json.dumps({"session_number": 2})])
+
+        loaded = list(iter_sessions(path))
+        assert [s["session_number"] for s in loaded] == [1, 2]
+        value = loaded[0]["spans"][0]["attributes.output.value"]
+        assert value != value  # NaN
+
+    def test_empty_file(self, tmp_path):
+        """Test that an empty file yields nothing."""
+        path = tmp_path / "empty.jsonl"
+        path.write_bytes(b"")
+
+        assert list(iter_sessions(path)) == []
+
+    def test_is_lazy(self, tmp_path, sessions):
+        """Test that sessions are produced one at a time."""
+        path = write_lines(tmp_path / "sessions.jsonl", [json.dumps(s) for s in sessions])
+
+        iterator = iter_sessions(path)
+        assert next(iterator) == sessions[0]
+        assert load_sessions(path) == sessions
+
+
+class TestCompareMessages:
+    """Test fingerprint-based message comparison."""
+
+    def test_duplicates_and_new_messages(self):
+        """Test that overlap is computed by message content."""
+        previous = [{"message.role": "user", "message.content": "a"}, {"message.role": "assistant", "message.content": "b"}]
+        current = previous + [{"message.role": "user", "message.content": "c"}]
+
+        result = compare_messages(previous, current)
+
+        assert result["duplicated_count"] == 2
+        assert result["new_count"] == 1
+        assert result["new_messages"] == [current[2]]
+        assert result["overlap_percentage"] == pytest.approx(200 / 3)
+
+    def test_key_order_does_not_matter(self):
+        """Test that dicts with the same items in different order match."""
+        result = compare_messages([{"a": 1, "b": 2}], [{"b": 2, "a": 1}])
+
+        assert result["duplicated_count"] == 1
+        assert result["new_count"] == 0
+
+
+def make_session(number: int) -> dict:
+    """Build a minimal session record for analyze_session."""
+    return {
+        "session_number": number,
+        "session_id": f"s{number}",
+        "span_count": 1,
+        "duration_seconds": 0.0,
+        "unique_traces": 1,
+        "spans": [{"name": f"span-{number}", "context.span_id": f"{number:016d}"}],
+    }
+
+
+class TestParallelRendering:
+    """Test the --jobs worker pool."""
+
+    def test_reports_in_input_order(self):
+        """Test that parallel reports match serial rendering, in order."""
+        sessions = [make_session(i) for i in range(1, 8)]
+
+        reports = list(render_sessions_parallel(iter(sessions), jobs=3))
+
+        assert reports == [render_session(s) for s in sessions]
+
+    def test_reads_ahead_a_bounded_number_of_sessions(self):
+        """Test that sessions are pulled from the iterator lazily."""
+        consumed = []
+
+        def sessions():
+            for i in range(1, 51):
+                consumed.append(i)
+                yield make_session(i)
+
+        reports = render_sessions_parallel(sessions(), jobs=1)
+        next(reports)
+
+        window = compare_spans.SESSIONS_IN_FLIGHT_PER_WORKER
+        assert len(consumed) <= window + 1
+        assert len(list(reports)) == 49
+
+    def test_jobs_must_not_be_negative(self):
+        """Test the --jobs argument type."""
+        assert non_negative_int("0") == 0
+        assert non_negative_int("4") == 4
+        with pytest.raises(argparse.ArgumentTypeError):
+            non_negative_int("-1")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test suite for export_arize.py
+
+Tests splitting export date ranges into daily windows.
+"""
+
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("arize")
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from src.export_arize import day_windows, fetch_windowed
+
+
+class TestDayWindows:
+    """Test splitting [start, end) into windows of at most one day."""
+
+    def test_whole_days(self):
+        """Test a range of exactly three days."""
+        start = datetime(2025, 1, 1)
+
+        windows = day_windows(start, start + timedelta(days=3))
+
+        assert windows == [
+            (datetime(2025, 1, 1), datetime(2025, 1, 2)),
+            (datetime(2025, 1, 2), datetime(2025, 1, 3)),
+            (datetime(2025, 1, 3), datetime(2025, 1, 4)),
+        ]
+
+    def test_last_window_clipped(self):
+        """Test that a partial final day ends at the end of the range."""
+        start = datetime(2025, 1, 1, 12, 30)
+        end = datetime(2025, 1, 3, 6, 0)
+
+        windows = day_windows(start, end)
+
+        assert windows[0] == (start, start + timedelta(days=1))
+        assert windows[-1] == (start + timedelta(days=1), end)
+        assert len(windows) == 2
+
+    def test_windows_are_contiguous(self):
+        """Test that windows cover the range with no gaps or overlaps."""
+        start = datetime(2025, 1, 1, 7, 15)
+        end = start + timedelta(days=6, hours=5)
+
+        windows = day_windows(start, end)
+
+        assert windows[0][0] == start
+        assert windows[-1][1] == end
+        assert all(prev[1] == cur[0] for prev, cur in zip(windows, windows[1:]))
+        assert all(timedelta(0) < e - s <= timedelta(days=1) for s, e in windows)
+
+    def test_shorter_than_a_day(self):
+        """Test that a sub-day range is a single window."""
+        start = datetime(2025, 1, 1)
+        end = start + timedelta(hours=3)
+
+        assert day_windows(start, end) == [(start, end)]
+
+    @pytest.mark.parametrize("offset", [timedelta(0), timedelta(hours=-1)])
+    def test_empty_range(self, offset):
+        """Test that an empty or reversed range has no windows."""
+        start = datetime(2025, 1, 1)
+
+        assert day_windows(start, start + offset) == []
+
+
+class FakeClient:
+    """Arize export client stub that records requested windows."""
+
+    def __init__(self):
+        self.calls = []
+
+    def export_model_to_df(self, start_time, end_time, **kwargs):
+        self.calls.append((start_time, end_time))
+        return pd.DataFrame({"start_time": [start_time]})
+
+
+class TestFetchWindowed:
+    """Test concurrent fetching of daily windows."""
+
+    def test_frames_concatenated_in_window_order(self):
+        """Test that every window is fetched once and results keep date order."""
+        client = FakeClient()
+        start = datetime(2025, 1, 1)
+        end = start + timedelta(days=10)
+
+        df = fetch_windowed(client, {"model_id": "m"}, start, end)
+
+        assert sorted(client.calls) == day_windows(start, end)
+        assert df["start_time"].tolist() == [s for s, _ in day_windows(start, end)]
+
+    def test_single_window_fetched_directly(self):
+        """Test that a range of one day or less is a single request."""
+        client = FakeClient()
+        start = datetime(2025, 1, 1)
+
+        fetch_windowed(client, {"model_id": "m"}, start, start + timedelta(hours=12))
+
+        assert client.calls == [(start, start + timedelta(hours=12))]
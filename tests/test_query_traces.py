@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Test suite for query_traces.py
+
+Tests the on-disk span cache used by fetch_spans, multi-term search matching
+and session grouping.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("phoenix")
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from src import query_traces
+from src.query_traces import (
+    _match_any_term,
+    extract_session_ids,
+    fetch_spans,
+    group_by_session,
+    span_cache_path,
+)
+
+
+class FakeClient:
+    """Phoenix client stub that counts span downloads."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.fetches = 0
+
+    def get_spans_dataframe(self, **kwargs):
+        self.fetches += 1
+        return self.df.copy()
+
+
+@pytest.fixture
+def spans():
+    """A small span frame with dict metadata."""
+    return pd.DataFrame({
+        "context.trace_id": ["t1", "t2"],
+        "attributes.metadata": [{"user_id": "u_session_S1"}, None],
+    })
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the span cache at a temporary directory."""
+    monkeypatch.setattr(query_traces, "SPAN_CACHE_DIR", tmp_path)
+    monkeypatch.setenv("PHOENIX_BASE_URL", "http://phoenix-a:6006")
+    return tmp_path
+
+
+class TestSpanCache:
+    """Test span cache reuse and invalidation."""
+
+    def test_fresh_cache_is_reused(self, cache_dir, spans):
+        """Test that a second fetch within the TTL skips the download."""
+        client = FakeClient(spans)
+
+        first = fetch_spans(client, "proj")
+        second = fetch_spans(client, "proj")
+
+        assert client.fetches == 1
+        pd.testing.assert_frame_equal(first, second)
+        assert second["attributes.metadata"].iloc[0] == {"user_id": "u_session_S1"}
+
+    def test_expired_cache_is_refetched(self, cache_dir, spans):
+        """Test that a cache older than the TTL is ignored."""
+        client = FakeClient(spans)
+        fetch_spans(client, "proj")
+        stale = time.time() - query_traces.SPAN_CACHE_TTL_SECONDS - 1
+        os.utime(span_cache_path("proj"), (stale, stale))
+
+        fetch_spans(client, "proj")
+
+        assert client.fetches == 2
+
+    def test_refresh_bypasses_cache(self, cache_dir, spans):
+        """Test that --refresh always downloads."""
+        client = FakeClient(spans)
+        fetch_spans(client, "proj")
+
+        fetch_spans(client, "proj", refresh=True)
+
+        assert client.fetches == 2
+
+    def test_unreadable_cache_is_a_miss(self, cache_dir, spans, capsys):
+        """Test that a truncated cache file is re-fetched and replaced."""
+        client = FakeClient(spans)
+        fetch_spans(client, "proj")
+        cache_file = span_cache_path("proj")
+        cache_file.write_bytes(cache_file.read_bytes()[:20])
+
+        df = fetch_spans(client, "proj")
+
+        assert client.fetches == 2
+        assert "Ignoring unreadable cache" in capsys.readouterr().out
+        pd.testing.assert_frame_equal(df, pd.read_pickle(cache_file))
+
+    def test_cache_is_keyed_by_server(self, cache_dir, spans, monkeypatch):
+        """Test that switching PHOENIX_BASE_URL does not reuse another server's spans."""
+        client = FakeClient(spans)
+        fetch_spans(client, "proj")
+        first_path = span_cache_path("proj")
+
+        monkeypatch.setenv("PHOENIX_BASE_URL", "http://phoenix-b:6006")
+        fetch_spans(client, "proj")
+
+        assert client.fetches == 2
+        assert span_cache_path("proj") != first_path
+
+    def test_cache_is_keyed_by_project(self, cache_dir, spans):
+        """Test that projects are cached separately."""
+        client = FakeClient(spans)
+
+        fetch_spans(client, "proj")
+        fetch_spans(client, "other")
+
+        assert client.fetches == 2
+
+    def test_refetch_overwrites_cache_file(self, cache_dir, spans):
+        """Test that each server and project keeps a single cache file."""
+        client = FakeClient(spans)
+        fetch_spans(client, "proj")
+        client.df = spans.iloc[:1]
+
+        fetch_spans(client, "proj", refresh=True)
+
+        assert [p.name for p in cache_dir.iterdir()] == [span_cache_path("proj").name]
+        assert len(pd.read_pickle(span_cache_path("proj"))) == 1
+
+    def test_no_temporary_files_left(self, cache_dir, spans):
+        """Test that the atomic write leaves only the cache file behind."""
+        fetch_spans(FakeClient(spans), "proj")
+
+        assert [p.name for p in cache_dir.iterdir()] == [span_cache_path("proj").name]
+
+    def test_empty_result_not_cached(self, cache_dir):
+        """Test that an empty download is not written to the cache."""
+        client = FakeClient(pd.DataFrame())
+
+        fetch_spans(client, "proj")
+
+        assert not span_cache_path("proj").exists()
+
+
+@pytest.fixture(params=["ahocorasick", "str.contains"])
+def matcher(request, monkeypatch):
+    """Run _match_any_term with and without the Aho-Corasick automaton."""
+    if request.param == "ahocorasick":
+        pytest.importorskip("ahocorasick")
+    else:
+        monkeypatch.setattr(query_traces, "ahocorasick", None)
+    return _match_any_term
+
+
+class TestMatchAnyTerm:
+    """Test the search-term mask used by query_by_search."""
+
+    @pytest.fixture
+    def texts(self):
+        """Lowercased search texts with missing values."""
+        return pd.Series(
+            ["fix cwork-797 today", None, "eng2-481 and cwork-797", "nothing here", float("nan"), ""],
+            index=[10, 11, 12, 13, 14, 15],
+        )
+
+    def test_single_term(self, matcher, texts):
+        """Test matching one term."""
+        mask = matcher(texts, ["cwork-797"])
+
+        assert mask.tolist() == [True, False, True, False, False, False]
+
+    def test_any_of_several_terms(self, matcher, texts):
+        """Test that a text matches when it contains any term."""
+        mask = matcher(texts, ["eng2-481", "cwork-797", "absent"])
+
+        assert mask.tolist() == [True, False, True, False, False, False]
+
+    def test_overlapping_terms(self, matcher):
+        """Test terms that are prefixes or substrings of each other."""
+        texts = pd.Series(["abcd", "ab", "bc", "xyz"])
+
+        assert matcher(texts, ["abc", "bcd", "b"]).tolist() == [True, True, True, False]
+
+    def test_regex_characters_are_literal(self, matcher):
+        """Test that terms are matched as plain substrings."""
+        texts = pd.Series(["a.c", "abc", "(x)"])
+
+        assert matcher(texts, ["a.c", "(x)"]).tolist() == [True, False, True]
+
+    def test_empty_term_matches_text(self, matcher, texts):
+        """Test that an empty term matches every non-missing text."""
+        mask = matcher(texts, ["absent", ""])
+
+        assert mask.tolist() == [True, False, True, True, False, True]
+
+    def test_mask_is_boolean_and_aligned(self, matcher, texts):
+        """Test that the mask keeps the input index and bool dtype."""
+        mask = matcher(texts, ["cwork-797", "eng2-481"])
+
+        assert mask.dtype == bool
+        assert mask.index.equals(texts.index)
+
+
+class TestExtractSessionIds:
+    """Test session IDs used to group query results."""
+
+    def test_lookup_order_and_trace_fallback(self):
+        """Test the metadata lookup order, ignoring string metadata and falling back to trace_id."""
+        df = pd.DataFrame({
+            "context.trace_id": ["t1", "t2", "t3", "t4", "t5", "t6"],
+            "attributes.metadata": [
+                {"user_id": "u_session_A", "user_api_key_end_user_id": "k_session_B"},
+                {"user_id": "plain", "user_api_key_end_user_id": "k_session_B",
+                 "requester_metadata": {"user_id": "r_session_C"}},
+                {"requester_metadata": {"user_id": "r_session_C"}},
+                {},
+                "{'user_id': 'u_session_S'}",
+                None,
+            ],
+        })
+
+        assert extract_session_ids(df).tolist() == ["A", "B", "C", "t4", "t5", "t6"]
+
+    def test_without_metadata_column(self):
+        """Test that spans without metadata are keyed by trace_id."""
+        df = pd.DataFrame({"context.trace_id": ["t1", "t2"]})
+
+        assert extract_session_ids(df).tolist() == ["t1", "t2"]
+
+    def test_group_by_session(self):
+        """Test that spans sharing a session ID are grouped together."""
+        df = pd.DataFrame({
+            "context.trace_id": ["t1", "t2", "t3"],
+            "attributes.metadata": [{"user_id": "u_session_S1"}, {"user_id": "v_session_S1"}, None],
+        })
+
+        groups = group_by_session(df)
+
+        assert {key: len(group) for key, group in groups.items()} == {"S1": 2, "t3": 1}
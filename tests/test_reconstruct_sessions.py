@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test suite for reconstruct_sessions.py
+
+Tests the parsed-trace cache used by load_trace_data.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from src import reconstruct_sessions
+from src.reconstruct_sessions import load_trace_data, trace_cache_path
+
+
+def write_spans(path: Path, spans: list[dict]) -> Path:
+    """Write spans as JSONL."""
+    path.write_text("".join(json.dumps(span) + "\n" for span in spans))
+    return path
+
+
+def span(span_id: str, start_ms: int, session: str = "S1") -> dict:
+    """Build a minimal span record."""
+    return {
+        "context.span_id": span_id,
+        "context.trace_id": "t1",
+        "parent_id": None,
+        "name": f"span-{span_id}",
+        "start_time": start_ms,
+        "end_time": start_ms + 10,
+        "attributes.metadata": {"user_id": f"u_session_{session}"},
+    }
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Point the trace cache at a temporary directory."""
+    path = tmp_path / "cache"
+    monkeypatch.setattr(reconstruct_sessions, "TRACE_CACHE_DIR", path)
+    return path
+
+
+@pytest.fixture
+def traces(tmp_path):
+    """A traces file with spans out of time order."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    return write_spans(data_dir / "traces.jsonl", [span("b", 2000), span("a", 1000)])
+
+
+def cache_file(traces: Path) -> Path:
+    """Return the cache path for a traces file."""
+    return trace_cache_path(str(traces))
+
+
+def age(path: Path, seconds: int) -> None:
+    """Move a file's mtime into the past."""
+    stat = path.stat()
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+class TestTraceCache:
+    """Test trace cache reuse and invalidation."""
+
+    def test_cache_written_and_reused(self, traces, capsys):
+        """Test that a second load returns the cached frame."""
+        first = load_trace_data(str(traces))
+        assert cache_file(traces).exists()
+        assert "Using cached" not in capsys.readouterr().out
+
+        second = load_trace_data(str(traces))
+
+        assert "Using cached" in capsys.readouterr().out
+        pd.testing.assert_frame_equal(first, second)
+        assert second["context.span_id"].tolist() == ["a", "b"]
+        assert second["attributes.metadata"].iloc[0] == {"user_id": "u_session_S1"}
+
+    def test_newer_traces_invalidate_cache(self, traces, capsys):
+        """Test that a cache older than the traces file is rebuilt."""
+        load_trace_data(str(traces))
+        write_spans(traces, [span("c", 3000)])
+        age(cache_file(traces), 60)
+        capsys.readouterr()
+
+        df = load_trace_data(str(traces))
+
+        assert "Using cached" not in capsys.readouterr().out
+        assert df["context.span_id"].tolist() == ["c"]
+
+    def test_newer_tools_file_invalidates_cache(self, traces, capsys):
+        """Test that the tools file is part of the freshness check."""
+        load_trace_data(str(traces))
+        age(cache_file(traces), 60)
+        age(traces, 120)
+        write_spans(traces.with_name("traces_tools.jsonl"), [span("tool", 1500)])
+        capsys.readouterr()
+
+        df = load_trace_data(str(traces))
+
+        assert "Using cached" not in capsys.readouterr().out
+        assert df["context.span_id"].tolist() == ["a", "tool", "b"]
+
+    def test_truncated_cache_is_reparsed(self, traces, capsys):
+        """Test that a partial cache file is ignored and replaced."""
+        expected = load_trace_data(str(traces))
+        cache = cache_file(traces)
+        cache.write_bytes(cache.read_bytes()[:60])
+        capsys.readouterr()
+
+        df = load_trace_data(str(traces))
+
+        assert "Ignoring unreadable cache" in capsys.readouterr().out
+        pd.testing.assert_frame_equal(df, expected)
+        pd.testing.assert_frame_equal(load_trace_data(str(traces)), expected)
+
+    def test_cache_is_keyed_by_resolved_path(self, traces, tmp_path, monkeypatch, capsys):
+        """Test that same-named files in other directories get their own cache."""
+        load_trace_data(str(traces))
+        other = write_spans(tmp_path / "traces.jsonl", [span("z", 5000)])
+        capsys.readouterr()
+
+        df = load_trace_data(str(other))
+
+        assert "Using cached" not in capsys.readouterr().out
+        assert df["context.span_id"].tolist() == ["z"]
+        assert cache_file(other) != cache_file(traces)
+
+        monkeypatch.chdir(traces.parent)
+        load_trace_data("traces.jsonl")
+        assert "Using cached" in capsys.readouterr().out
+
+    def test_no_cache(self, traces, capsys):
+        """Test that use_cache=False neither reads nor writes the cache."""
+        load_trace_data(str(traces), use_cache=False)
+        assert not cache_file(traces).exists()
+
+        load_trace_data(str(traces))
+        capsys.readouterr()
+        load_trace_data(str(traces), use_cache=False)
+
+        assert "Using cached" not in capsys.readouterr().out
+
+    def test_nothing_written_next_to_input(self, traces, cache_dir):
+        """Test that only the cache file is written, and not beside the traces."""
+        load_trace_data(str(traces))
+
+        assert [p.name for p in traces.parent.iterdir()] == ["traces.jsonl"]
+        assert [p.name for p in cache_dir.iterdir()] == [cache_file(traces).name]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test suite for trace_utils.py
+
+Tests the session ID extraction shared by analyze_sessions, reconstruct_sessions
+and query_traces.
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from src.trace_utils import extract_session_ids, session_suffix
+
+
+def ids(series: pd.Series) -> list:
+    """Return session IDs as a list, with None for rows without one."""
+    return [None if pd.isna(value) else value for value in series]
+
+
+class TestSessionSuffix:
+    """Test extracting the text after the 'session_' marker."""
+
+    def test_last_marker_wins(self):
+        """Test that the suffix after the last marker is returned."""
+        values = pd.Series(["user_abc_session_S1", "session_a_session_b", "no marker", None])
+
+        assert ids(session_suffix(values)) == ["S1", "b", None, None]
+
+
+class TestExtractSessionIds:
+    """Test the metadata lookup order for session IDs."""
+
+    def test_lookup_order(self):
+        """Test user_id, then user_api_key_end_user_id, then requester_metadata.user_id."""
+        metadata = pd.Series([
+            {"user_id": "u_session_A", "user_api_key_end_user_id": "k_session_B",
+             "requester_metadata": {"user_id": "r_session_C"}},
+            {"user_id": "plain", "user_api_key_end_user_id": "k_session_B",
+             "requester_metadata": {"user_id": "r_session_C"}},
+            {"user_id": "plain", "requester_metadata": {"user_id": "r_session_C"}},
+            {"user_id": "plain"},
+            {},
+        ])
+
+        assert ids(extract_session_ids(metadata)) == ["A", "B", "C", None, None]
+
+    def test_string_metadata(self):
+        """Test that stringified dicts have trailing quotes and braces removed."""
+        metadata = pd.Series(["{'user_id': 'u_session_S1'}", '{"user_id": "u_session_S2"}', "{'user_id': 'x'}"])
+
+        assert ids(extract_session_ids(metadata)) == ["S1", "S2", None]
+
+    def test_mixed_and_missing_metadata(self):
+        """Test that results stay aligned with the input index across row kinds."""
+        metadata = pd.Series(
+            [None, "{'user_id': 'u_session_S1'}", {"user_id": "u_session_S2"}, float("nan"), 42],
+            index=[5, 3, 9, 1, 7],
+        )
+
+        result = extract_session_ids(metadata)
+
+        assert result.index.equals(metadata.index)
+        assert ids(result) == [None, "S1", "S2", None, None]
+
+    def test_no_dict_metadata(self):
+        """Test a column with no dict rows at all."""
+        metadata = pd.Series([None, None])
+
+        assert extract_session_ids(metadata).isna().all()
+
+    def test_other_fields_ignored(self):
+        """Test that only the three candidate fields are read."""
+        metadata = pd.Series([
+            {"trace_name": "x_session_X", "tags": ["session_Y"], "requester_metadata": "r_session_Z"},
+            {"headers": {"user_id": "h_session_H"}, "requester_metadata": {"user_id": "r_session_R"}},
+        ])
+
+        assert ids(extract_session_ids(metadata)) == [None, "R"]
+
+    def test_strings_can_be_excluded(self):
+        """Test include_strings=False (as used by query_traces)."""
+        metadata = pd.Series(["{'user_id': 'u_session_S1'}", {"user_id": "u_session_S2"}])
+
+        assert ids(extract_session_ids(metadata, include_strings=False)) == [None, "S2"]